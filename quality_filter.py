@@ -8,12 +8,23 @@ structured decisions: Keep / Remove / Needs more information / Needs editing.
 
 import argparse
 import csv
+import hashlib
 import json
+import math
 import re
 import sys
-from dataclasses import dataclass
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used otherwise
+    orjson = None
 
 DECISIONS = ["Keep", "Remove", "Needs more information", "Needs editing"]
 
@@ -46,22 +57,101 @@ DEFAULT_CONFIG = {
     "dedupe": True,
 }
 
+if orjson is not None:
+    json_loads = orjson.loads
+
+    def json_line(obj: Any) -> bytes:
+        return orjson.dumps(obj) + b"\n"
+
+else:
+    json_loads = json.loads
+
+    def json_line(obj: Any) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+_TAG_SPLIT_RE = re.compile(r"[;,]")
+
 
-@dataclass
 class Record:
-    raw: Dict[str, str]
-    name: str
-    description: str
-    address: str
-    tags: str
-    source: str
-    key: str
+    # Plain __slots__ class (dataclass(slots=True) needs Python 3.10).
+    __slots__ = (
+        "raw",
+        "name",
+        "description",
+        "address",
+        "tags",
+        "source",
+        "key",
+        "name_norm",
+        "desc_norm",
+        "tags_norm",
+    )
+
+    def __init__(
+        self,
+        raw: Dict[str, str],
+        name: str,
+        description: str,
+        address: str,
+        tags: str,
+        source: str,
+        key: str,
+        name_norm: str,
+        desc_norm: str,
+        tags_norm: str,
+    ) -> None:
+        self.raw = raw
+        self.name = name
+        self.description = description
+        self.address = address
+        self.tags = tags
+        self.source = source
+        self.key = key
+        self.name_norm = name_norm
+        self.desc_norm = desc_norm
+        self.tags_norm = tags_norm
+
+
+class BloomFilter:
+    """Approximate set for dedupe keys; far smaller than a set on huge inputs."""
+
+    def __init__(self, capacity: int, error_rate: float = 1e-7) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1 (exclusive)")
+        self.num_bits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> List[int]:
+        # Double hashing over one 128-bit digest gives all k probe positions.
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """Set the key's bits; return True if they were all set already (probably seen)."""
+        bits = self.bits
+        present = True
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                present = False
+                bits[p >> 3] |= mask
+        return present
 
 
 def normalize_text(text: str) -> str:
-    text = (text or "").strip().lower()
-    text = re.sub(r"\s+", " ", text)
-    return text
+    # str.split() uses the same Unicode whitespace set as re's \s, without the regex engine.
+    return " ".join(text.lower().split()) if text else ""
 
 
 def extract_field(data: Dict[str, str], keys: List[str]) -> str:
@@ -88,7 +178,18 @@ def build_record(row: Dict[str, str]) -> Record:
     source = extract_field(row, ["source"]) 
 
     key = normalize_text(f"{name}|{address}")
-    return Record(raw=row, name=name, description=description, address=address, tags=tags, source=source, key=key)
+    return Record(
+        raw=row,
+        name=name,
+        description=description,
+        address=address,
+        tags=tags,
+        source=source,
+        key=key,
+        name_norm=normalize_text(name),
+        desc_norm=normalize_text(description),
+        tags_norm=normalize_text(tags),
+    )
 
 
 def load_input(path: str) -> Iterable[Dict[str, str]]:
@@ -97,24 +198,33 @@ def load_input(path: str) -> Iterable[Dict[str, str]]:
         raise FileNotFoundError(path)
 
     if p.suffix.lower() == ".csv":
+        # csv.reader plus a fixed header avoids DictReader's per-row bookkeeping.
         with p.open(newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            width = len(header)
             for row in reader:
-                yield {k: (v or "") for k, v in row.items()}
+                if not row:
+                    continue
+                if len(row) < width:
+                    row += [""] * (width - len(row))
+                yield dict(zip(header, row))
         return
 
     if p.suffix.lower() in {".jsonl", ".ndjson"}:
-        with p.open(encoding="utf-8") as f:
+        # Both parsers accept UTF-8 bytes, so lines are never decoded to str first.
+        with p.open("rb") as f:
             for line in f:
                 line = line.strip()
                 if not line:
                     continue
-                yield json.loads(line)
+                yield json_loads(line)
         return
 
     if p.suffix.lower() == ".json":
-        with p.open(encoding="utf-8") as f:
-            data = json.load(f)
+        data = json_loads(p.read_bytes())
         if isinstance(data, list):
             for row in data:
                 if isinstance(row, dict):
@@ -130,60 +240,185 @@ def load_input(path: str) -> Iterable[Dict[str, str]]:
     raise ValueError("Unsupported input format. Use CSV, JSON, or JSONL.")
 
 
-def save_output(path: str, rows: List[Dict[str, str]]) -> None:
-    p = Path(path)
-    if p.suffix.lower() == ".csv":
-        fieldnames = sorted({k for row in rows for k in row.keys()})
-        with p.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-        return
-
-    with p.open("w", encoding="utf-8") as f:
-        for row in rows:
-            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+class RowWriter:
+    """Streams rows to CSV (fixed fieldnames) or JSONL as they are produced.
+
+    CSV rows with keys outside the fieldnames lose those values; each such key
+    is reported once on stderr.
+    """
+
+    def __init__(self, path: str, fieldnames: Optional[List[str]] = None) -> None:
+        p = Path(path)
+        self._path = path
+        self._csv = p.suffix.lower() == ".csv"
+        if self._csv:
+            self._fieldnames = list(fieldnames or [])
+            self._fieldset = frozenset(self._fieldnames)
+            self._dropped: Set[str] = set()
+            self._file = p.open("w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self._fieldnames)
+        else:
+            self._file = p.open("wb")
+        self.count = 0
+
+    def _check_keys(self, row: Dict[str, str]) -> None:
+        if row.keys() <= self._fieldset:
+            return
+        extra = row.keys() - self._fieldset - self._dropped
+        if extra:
+            self._dropped.update(extra)
+            print(
+                f"Warning: {self._path}: dropping columns not in the CSV header: "
+                f"{', '.join(sorted(map(str, extra)))} (use --fieldnames to keep them)",
+                file=sys.stderr,
+            )
+
+    def write_columns(self, raws: List[Dict[str, str]], columns: Dict[str, List[str]]) -> None:
+        """Write a batch of input rows plus column-wise output values.
+
+        Rows are only materialized here; `columns` values override the raw
+        fields of the same name, as a dict update would.
+        """
+        n = len(raws)
+        if self._csv:
+            sources = [(k, columns.get(k)) for k in self._fieldnames]
+            check_keys = self._check_keys
+            rows = []
+            for i in range(n):
+                check_keys(raws[i])
+                get = raws[i].get
+                rows.append([col[i] if col is not None else get(k, "") for k, col in sources])
+            self._writer.writerows(rows)
+        else:
+            items = list(columns.items())
+            write = self._file.write
+            for i in range(n):
+                out = dict(raws[i])
+                for k, col in items:
+                    out[k] = col[i]
+                write(json_line(out))
+        self.count += n
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_writer(path: str, fieldnames: Optional[List[str]] = None) -> RowWriter:
+    return RowWriter(path, fieldnames)
 
 
 def load_config(path: Optional[str]) -> Dict:
     config = dict(DEFAULT_CONFIG)
     if not path:
-        return config
+        return prepare_config(config)
     with open(path, encoding="utf-8") as f:
         override = json.load(f)
     if isinstance(override, dict):
         config.update(override)
+    return prepare_config(config)
+
+
+def prepare_config(config: Dict) -> Dict:
+    # Resolve per-row thresholds once instead of int(config.get(...)) per record.
+    config["_min_desc"] = int(config.get("min_description_length", 0))
+    config["_min_tags"] = int(config.get("min_tags_count", 0))
+    # Normalize keyword lists once and compile them into alternation regexes,
+    # so classify() runs one search per field group instead of a scan per keyword.
+    config["_remove_norm"] = [
+        normalize_text(kw) for kw in config.get("remove_keywords", []) if kw.strip()
+    ]
+    config["_profanity_norm"] = [
+        normalize_text(kw) for kw in config.get("profanity_keywords", []) if kw.strip()
+    ]
+    config["_remove_re"] = compile_keywords(config["_remove_norm"])
+    config["_profanity_re"] = compile_keywords(config["_profanity_norm"])
+    config["_keyword_re"] = compile_keywords(config["_remove_norm"] + config["_profanity_norm"])
     return config
 
 
-def classify(record: Record, config: Dict, seen: set) -> Tuple[str, List[str], str, int]:
+def compile_keywords(keywords: List[str]) -> Optional[re.Pattern]:
+    # One alternation pass per record instead of one substring scan per keyword.
+    if not keywords:
+        return None
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+def first_keyword(keywords: List[str], fields: Tuple[str, ...]) -> str:
+    # Only called on a hit; reports the first configured keyword, as before.
+    for kw in keywords:
+        if any(kw in field for field in fields):
+            return kw
+    return ""
+
+
+def keyword_candidates(records: List[Record], config: Dict) -> Set[int]:
+    """Return indexes of records that may hit a keyword, using one scan per batch."""
+    pattern = config["_keyword_re"]
+    if pattern is None:
+        return set()
+
+    starts = []
+    texts = []
+    offset = 0
+    for r in records:
+        text = f"{r.name_norm}\n{r.desc_norm}\n{r.tags_norm}"
+        starts.append(offset)
+        texts.append(text)
+        offset += len(text) + 1
+
+    # Normalized text has no newlines, so a match never spans two records.
+    blob = "\n".join(texts)
+    return {bisect_right(starts, m.start()) - 1 for m in pattern.finditer(blob)}
+
+
+Checks = Tuple[List[str], List[str], List[str]]
+
+
+def is_duplicate(record: Record, config: Dict, seen: set) -> bool:
+    return is_duplicate_key(record.key, config, seen)
+
+
+def is_duplicate_key(key: str, config: Dict, seen: set) -> bool:
+    if not key:
+        return False
+    if isinstance(seen, BloomFilter):
+        # One hashing pass tests and records the key.
+        return seen.add(key) and bool(config.get("dedupe"))
+    if config.get("dedupe") and key in seen:
+        return True
+    seen.add(key)
+    return False
+
+
+def check_record(record: Record, config: Dict, scan_keywords: bool = True) -> Checks:
+    """Run the per-record rules; dedupe is left to the caller since it is ordered state."""
     reasons_remove = []
     reasons_info = []
     reasons_edit = []
 
-    name_norm = normalize_text(record.name)
-    desc_norm = normalize_text(record.description)
-    tags_norm = normalize_text(record.tags)
-
-    if config.get("dedupe") and record.key in seen and record.key:
-        reasons_remove.append("duplicate_name_address")
-    else:
-        if record.key:
-            seen.add(record.key)
+    if scan_keywords:
+        name_norm = record.name_norm
+        desc_norm = record.desc_norm
+        tags_norm = record.tags_norm
 
-    # Remove keywords (chains / not a fit)
-    for kw in config.get("remove_keywords", []):
-        kw_norm = normalize_text(kw)
-        if kw_norm and (kw_norm in name_norm or kw_norm in desc_norm or kw_norm in tags_norm):
+        # Remove keywords (chains / not a fit)
+        remove_re = config["_remove_re"]
+        if remove_re is not None and remove_re.search(f"{name_norm}\n{desc_norm}\n{tags_norm}"):
+            kw_norm = first_keyword(config["_remove_norm"], (name_norm, desc_norm, tags_norm))
             reasons_remove.append(f"keyword:{kw_norm}")
-            break
 
-    # Profanity
-    for kw in config.get("profanity_keywords", []):
-        kw_norm = normalize_text(kw)
-        if kw_norm and (kw_norm in name_norm or kw_norm in desc_norm):
+        # Profanity
+        profanity_re = config["_profanity_re"]
+        if profanity_re is not None and profanity_re.search(f"{name_norm}\n{desc_norm}"):
+            kw_norm = first_keyword(config["_profanity_norm"], (name_norm, desc_norm))
             reasons_remove.append(f"profanity:{kw_norm}")
-            break
 
     # Missing required fields
     if not record.name:
@@ -192,19 +427,35 @@ def classify(record: Record, config: Dict, seen: set) -> Tuple[str, List[str], s
         reasons_info.append("missing_address")
 
     # Needs edit if description/tags missing or too short
-    min_desc = int(config.get("min_description_length", 0))
-    if record.description and len(record.description.strip()) < min_desc:
+    # (extract_field() already stripped the description).
+    if record.description and len(record.description) < config["_min_desc"]:
         reasons_edit.append("description_too_short")
     if not record.description:
         reasons_edit.append("missing_description")
 
-    if record.tags:
-        # Count tags by separators
-        tag_count = len([t for t in re.split(r"[;,]", record.tags) if t.strip()])
-    else:
-        tag_count = 0
-    if tag_count < int(config.get("min_tags_count", 0)):
-        reasons_edit.append("missing_tags")
+    min_tags = config["_min_tags"]
+    if min_tags > 0:
+        if record.tags:
+            # Count tags by separators
+            tag_count = len([t for t in _TAG_SPLIT_RE.split(record.tags) if t.strip()])
+        else:
+            tag_count = 0
+        if tag_count < min_tags:
+            reasons_edit.append("missing_tags")
+
+    return reasons_remove, reasons_info, reasons_edit
+
+
+_NO_REASONS: Tuple[str, ...] = ()
+
+
+def decide(checks: Checks, duplicate: bool = False) -> Tuple[str, Sequence[str], str, int]:
+    reasons_remove, reasons_info, reasons_edit = checks
+    # Fast path for the common clean row: nothing to concatenate or score.
+    if not (duplicate or reasons_remove or reasons_info or reasons_edit):
+        return "Keep", _NO_REASONS, "Medium", 100
+    if duplicate:
+        reasons_remove = ["duplicate_name_address"] + reasons_remove
 
     # Decision
     if reasons_remove:
@@ -235,22 +486,103 @@ def classify(record: Record, config: Dict, seen: set) -> Tuple[str, List[str], s
     return decision, reasons, confidence, score
 
 
-def emit_llm_batch(path: str, rows: List[Record]) -> None:
-    p = Path(path)
-    with p.open("w", encoding="utf-8") as f:
-        for r in rows:
-            payload = {
-                "name": r.name,
-                "description": r.description,
-                "address": r.address,
-                "tags": r.tags,
-                "source": r.source,
-                "prompt": (
-                    "Classify this recommendation into one of: Keep, Remove, "
-                    "Needs more information, Needs editing. Provide a short reason."
-                ),
-            }
-            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+def classify(
+    record: Record, config: Dict, seen: set, scan_keywords: bool = True
+) -> Tuple[str, Sequence[str], str, int]:
+    duplicate = is_duplicate(record, config, seen)
+    return decide(check_record(record, config, scan_keywords), duplicate)
+
+
+def check_rows(rows: List[Dict[str, str]], config: Dict) -> List[Tuple[Record, Checks]]:
+    # Keyword matching runs column-wise over the batch; only candidate rows
+    # pay for the per-record keyword checks.
+    records = [build_record(row) for row in rows]
+    candidates = keyword_candidates(records, config)
+    return [
+        (record, check_record(record, config, scan_keywords=i in candidates))
+        for i, record in enumerate(records)
+    ]
+
+
+BatchResult = List[Tuple[str, Checks, Optional[Dict[str, str]]]]
+
+
+def check_batch(rows: List[Dict[str, str]], config: Dict, with_llm: bool = False) -> BatchResult:
+    """Return (dedupe key, checks, LLM payload or None) per row, without the rows.
+
+    The caller keeps the raw rows, so a worker pool only ships these back.
+    """
+    return [
+        (record.key, checks, llm_payload(record) if with_llm else None)
+        for record, checks in check_rows(rows, config)
+    ]
+
+
+_WORKER_CONFIG: Optional[Dict] = None
+_WORKER_WITH_LLM = False
+
+
+def _init_worker(config: Dict, with_llm: bool) -> None:
+    global _WORKER_CONFIG, _WORKER_WITH_LLM
+    _WORKER_CONFIG = config
+    _WORKER_WITH_LLM = with_llm
+
+
+def _check_batch_worker(rows: List[Dict[str, str]]) -> BatchResult:
+    return check_batch(rows, _WORKER_CONFIG, _WORKER_WITH_LLM)
+
+
+def parallel_check_rows(
+    executor: ProcessPoolExecutor, batches: Iterable[List[Dict[str, str]]], window: int
+) -> Iterator[Tuple[List[Dict[str, str]], BatchResult]]:
+    # Keep a bounded number of batches in flight and yield them in input order,
+    # so dedupe in the parent stays exact and memory stays flat.
+    pending: Deque[Tuple[List[Dict[str, str]], Future]] = deque()
+    for batch in batches:
+        pending.append((batch, executor.submit(_check_batch_worker, batch)))
+        if len(pending) >= window:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+    while pending:
+        batch, future = pending.popleft()
+        yield batch, future.result()
+
+
+def iter_batches(rows: Iterable[Dict[str, str]], size: int) -> Iterable[List[Dict[str, str]]]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def llm_payload(r: Record) -> Dict[str, str]:
+    return {
+        "name": r.name,
+        "description": r.description,
+        "address": r.address,
+        "tags": r.tags,
+        "source": r.source,
+        "prompt": (
+            "Classify this recommendation into one of: Keep, Remove, "
+            "Needs more information, Needs editing. Provide a short reason."
+        ),
+    }
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
+
+
+def error_rate(value: str) -> float:
+    rate = float(value)
+    if not 0 < rate < 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1 (exclusive): {value}")
+    return rate
 
 
 def main() -> int:
@@ -259,34 +591,99 @@ def main() -> int:
     parser.add_argument("--output", required=True, help="Output CSV/JSONL")
     parser.add_argument("--config", default="", help="Optional JSON config file")
     parser.add_argument("--emit-llm-batch", default="", help="Write a JSONL file for LLM review")
+    parser.add_argument(
+        "--fieldnames",
+        default="",
+        help=(
+            "Comma-separated input columns for CSV output (default: the first row's keys; "
+            "keys missing from them are dropped with a warning)"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=5000,
+        help="Rows classified together per keyword scan (default: 5000)",
+    )
+    parser.add_argument(
+        "--dedupe-bloom-capacity",
+        type=positive_int,
+        default=None,
+        help="Use a Bloom filter sized for this many rows for dedupe instead of an exact set",
+    )
+    parser.add_argument(
+        "--dedupe-bloom-error-rate",
+        type=error_rate,
+        default=1e-7,
+        help="False-positive rate for the dedupe Bloom filter (default: 1e-7)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="Worker processes for the per-row checks (default: 1, no pool)",
+    )
     args = parser.parse_args()
 
     config = load_config(args.config)
-    rows = []
-    seen = set()
-    records = []
-
-    for row in load_input(args.input):
-        record = build_record(row)
-        decision, reasons, confidence, score = classify(record, config, seen)
-        out = dict(record.raw)
-        out.update(
-            {
-                "decision": decision,
-                "reasons": ";".join(reasons),
-                "confidence": confidence,
-                "quality_score": str(score),
+    if args.dedupe_bloom_capacity is not None:
+        seen = BloomFilter(args.dedupe_bloom_capacity, args.dedupe_bloom_error_rate)
+    else:
+        seen = set()
+
+    with ExitStack() as stack:
+        writer = None
+        llm_write = None
+        if args.emit_llm_batch:
+            # Always JSONL, whatever the file suffix.
+            llm_write = stack.enter_context(open(args.emit_llm_batch, "wb")).write
+        input_fields = [f.strip() for f in args.fieldnames.split(",") if f.strip()]
+
+        with_llm = llm_write is not None
+        batches = iter_batches(load_input(args.input), args.batch_size)
+        if args.workers > 1:
+            executor = stack.enter_context(
+                ProcessPoolExecutor(
+                    args.workers, initializer=_init_worker, initargs=(config, with_llm)
+                )
+            )
+            checked = parallel_check_rows(executor, batches, window=2 * args.workers)
+        else:
+            checked = ((batch, check_batch(batch, config, with_llm)) for batch in batches)
+
+        for raws, results in checked:
+            # Output columns are collected per batch and joined with the raw rows
+            # only when written, instead of building one output dict per row.
+            decisions = []
+            reasons_col = []
+            confidences = []
+            scores = []
+            for key, checks, payload in results:
+                duplicate = is_duplicate_key(key, config, seen)
+                decision, reasons, confidence, score = decide(checks, duplicate)
+                decisions.append(decision)
+                reasons_col.append(";".join(reasons))
+                confidences.append(confidence)
+                scores.append(str(score))
+                if with_llm:
+                    llm_write(json_line(payload))
+
+            columns = {
+                "decision": decisions,
+                "reasons": reasons_col,
+                "confidence": confidences,
+                "quality_score": scores,
             }
-        )
-        rows.append(out)
-        records.append(record)
+            if writer is None:
+                # CSV columns are fixed by --fieldnames or the first row.
+                fieldnames = list(dict.fromkeys([*(input_fields or raws[0]), *columns]))
+                writer = stack.enter_context(open_writer(args.output, fieldnames))
+            writer.write_columns(raws, columns)
 
-    save_output(args.output, rows)
-
-    if args.emit_llm_batch:
-        emit_llm_batch(args.emit_llm_batch, records)
+        if writer is None:
+            writer = stack.enter_context(open_writer(args.output, input_fields or None))
 
-    print(f"Wrote {len(rows)} rows to {args.output}")
+    print(f"Wrote {writer.count} rows to {args.output}")
     if args.emit_llm_batch:
         print(f"Wrote LLM batch to {args.emit_llm_batch}")
 
@@ -7,26 +7,46 @@ Outputs CSV with: name, full_address, description, tags, opening_date, source
 """
 
 import argparse
+import base64
+import bisect
+import contextlib
 import csv
 import datetime as dt
+import functools
+import gzip
+import hashlib
+import http.client
+import io
 import math
 import json
 import os
+import queue
 import re
+import sqlite3
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import urllib.parse
-import urllib.request
 import urllib.error
+import urllib.request
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used otherwise
+    orjson = None
 
 OVERPASS_URLS = [
     "https://overpass-api.de/api/interpreter",
     "https://overpass.kumi.systems/api/interpreter",
     "https://overpass.nchc.org.tw/api/interpreter",
 ]
+# Seconds a mirror may run before the next one is started as a hedge; Overpass
+# queries routinely take tens of seconds, so this is well above a normal answer.
+OVERPASS_HEDGE_DELAY = 60.0
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
 OSM_API_BASE = "https://api.openstreetmap.org/api/0.6"
 GOOGLE_PLACES_TEXT_URL = "https://places.googleapis.com/v1/places:searchText"
@@ -46,18 +66,294 @@ PRH_SWAGGER_URLS = [
     "https://avoindata.prh.fi/sv/ytj/swagger-ui",
 ]
 PRH_SEARCH_PATH_CANDIDATES = ["", "/companies", "/company", "/companies/search"]
+_SWAGGER_URL_RE = re.compile(r"""url\s*:\s*["']([^"']+)["']""")
+_SWAGGER_URLS_RE = re.compile(r'"urls"\s*:\s*\[\s*\{\s*"url"\s*:\s*"([^"]+)"')
+DEFAULT_USER_AGENT = "wom-new-openings-script"
+# Map the "," and "_" cuisine separators onto ";" so one str.split() covers all three.
+_CUISINE_SEPARATORS = str.maketrans(",_", ";;")
+_DIET_PREFIX = "diet:"
+_ADDR_KEYS = frozenset(
+    ("addr:full", "addr:street", "addr:housenumber", "addr:postcode", "addr:city", "addr:country")
+)
+# In order of preference.
+_DESCRIPTION_KEYS = ("description", "description:en", "short_description", "note")
+_YES_NO_KEYS = ("outdoor_seating", "delivery", "takeaway", "vegetarian", "vegan")
+OUTPUT_FIELDS = [
+    "name",
+    "full_address",
+    "description",
+    "tags",
+    "opening_date",
+    "osm_last_edit",
+    "osm_last_edit_age_days",
+    "osm_first_added",
+    "google_place_id",
+    "google_first_seen",
+    "google_first_review_date",
+    "source",
+]
+# Rows are flushed to the CSV in 1 MiB blocks rather than the default 8 KiB.
+OUTPUT_BUFFER_SIZE = 1 << 20
 HELSINKI_CENTER = (60.1699, 24.9384)
 HELSINKI_RADIUS_KM = 30
 
-DATE_PATTERNS = [
-    "%Y-%m-%d",
-    "%Y/%m/%d",
-    "%Y.%m.%d",
-    "%Y-%m",
-    "%Y/%m",
-    "%Y.%m",
-    "%Y",
-]
+# YYYY[-MM[-DD]] with one consistent "-", "/" or "." separator, optionally
+# followed by a time part ("T..." or " ...").
+DATE_RE = re.compile(r"^(\d{4})(?:([-/.])(\d{1,2})(?:\2(\d{1,2}))?)?(?:[ T].*)?$")
+_date_match = DATE_RE.match
+
+
+if orjson is not None:
+    # Both take/return UTF-8 bytes, so responses are parsed without a decode() copy.
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+else:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+_HTTP_LOCAL = threading.local()
+_REDIRECT_CODES = {301, 302, 303, 307, 308}
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def _proxy_for(scheme: str, netloc: str) -> Optional[urllib.parse.SplitResult]:
+    """The proxy urllib would use for this host (HTTP(S)_PROXY / NO_PROXY), if any."""
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(netloc.rpartition("@")[2]):
+        return None
+    if "://" not in proxy:
+        proxy = f"http://{proxy}"
+    return urllib.parse.urlsplit(proxy)
+
+
+def _http_connection(
+    scheme: str, netloc: str, timeout: float
+) -> Tuple[http.client.HTTPConnection, Optional[Dict[str, str]]]:
+    """Return (connection, proxy headers); the headers are None unless plain HTTP is
+    sent through a proxy, in which case requests must use the absolute URL."""
+    # One keep-alive connection per host per thread; http.client is not thread-safe.
+    pool = getattr(_HTTP_LOCAL, "pool", None)
+    if pool is None:
+        pool = _HTTP_LOCAL.pool = {}
+    proxy = _proxy_for(scheme, netloc)
+    key = (scheme, netloc, proxy)
+    entry = pool.get(key)
+    if entry is None:
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        if proxy is None:
+            entry = (conn_cls(netloc, timeout=timeout), None)
+        else:
+            proxy_headers = {}
+            if proxy.username:
+                credentials = (
+                    f"{urllib.parse.unquote(proxy.username)}:"
+                    f"{urllib.parse.unquote(proxy.password or '')}"
+                )
+                proxy_headers["Proxy-Authorization"] = (
+                    "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+                )
+            proxy_addr = proxy.netloc.rpartition("@")[2]
+            conn = conn_cls(proxy_addr, timeout=timeout)
+            if scheme == "https":
+                # CONNECT tunnel; TLS to the target runs inside it.
+                conn.set_tunnel(netloc, headers=proxy_headers)
+                entry = (conn, None)
+            else:
+                entry = (conn, proxy_headers)
+        pool[key] = entry
+    conn = entry[0]
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return entry
+
+
+def http_request(
+    url: str,
+    data: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+    method: Optional[str] = None,
+    timeout: float = 60,
+) -> bytes:
+    """Send a request over a reused connection and return the body.
+
+    Behaves like urllib.request.urlopen for callers: HTTP(S)_PROXY / NO_PROXY are honored,
+    redirects are followed, gzip bodies are decoded and non-2xx responses raise
+    urllib.error.HTTPError.
+    """
+    headers = dict(headers or {})
+    headers.setdefault("User-Agent", DEFAULT_USER_AGENT)
+    # JSON payloads (Overpass especially) compress several-fold on the wire.
+    headers.setdefault("Accept-Encoding", "gzip")
+    if data is not None:
+        headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
+    method = method or ("POST" if data is not None else "GET")
+
+    for _ in range(5):
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        conn, proxy_headers = _http_connection(parts.scheme, parts.netloc, timeout)
+        request_headers = headers
+        if proxy_headers is not None:
+            # Plain HTTP through a proxy: absolute-form target plus proxy credentials.
+            path = urllib.parse.urlunsplit(parts._replace(fragment=""))
+            request_headers = {**headers, **proxy_headers}
+        for attempt in range(2):
+            reused = conn.sock is not None
+            try:
+                conn.request(method, path, body=data, headers=request_headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                if body and resp.getheader("Content-Encoding", "").lower() == "gzip":
+                    body = gzip.decompress(body)
+                break
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                # A kept-alive socket may have been closed by the server; retry once fresh.
+                # Timeouts and other errors are never retried: the request may have
+                # reached the server, and a resend would skip the caller's rate limit.
+                if not reused or attempt:
+                    raise
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                raise
+
+        if resp.status in _REDIRECT_CODES and resp.getheader("Location"):
+            url = urllib.parse.urljoin(url, resp.getheader("Location"))
+            if resp.status == 303 or (resp.status in (301, 302) and method == "POST"):
+                method, data = "GET", None
+                headers.pop("Content-Type", None)
+            continue
+        if not 200 <= resp.status < 300:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        return body
+
+    raise urllib.error.URLError(f"Too many redirects: {url}")
+
+
+class RateLimiter:
+    """Space calls at least `interval` seconds apart, sleeping only for the remainder."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                time.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+
+# Nominatim usage policy: at most 1 request per second.
+NOMINATIM_LIMITER = RateLimiter(1.0)
+# Be gentle to the OSM history API.
+OSM_HISTORY_LIMITER = RateLimiter(1.0)
+
+DEFAULT_API_CACHE = "~/.cache/wom_openings/api.sqlite"
+DEFAULT_OVERPASS_CACHE_DIR = "~/.cache/wom_openings"
+GEOCODE_CACHE_TTL = 24 * 3600
+GOOGLE_SEARCH_CACHE_TTL = 24 * 3600
+# Registration details rarely change once published.
+PRH_DETAILS_CACHE_TTL = 7 * 24 * 3600
+PRH_ENDPOINT_CACHE_TTL = 24 * 3600
+PRH_DETAILS_WORKERS = 10
+CACHE_COMMIT_EVERY = 50
+CACHE_COMMIT_INTERVAL = 5.0
+
+
+class ResponseCache:
+    """Persistent key/value store (SQLite) for JSON-serializable API results.
+
+    Writes are committed in small groups (every CACHE_COMMIT_EVERY writes or
+    CACHE_COMMIT_INTERVAL seconds) so concurrent runs only briefly hold the write
+    lock. SQLite errors are reported and treated as misses: the cache must never
+    cost the caller an API result.
+    """
+
+    def __init__(self, path: str) -> None:
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Shared by the fetch threads; the lock serializes access to the connection.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._warned = False
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, ts REAL, value TEXT)"
+            )
+
+    def _warn(self, err: sqlite3.Error) -> None:
+        if not self._warned:
+            self._warned = True
+            print(
+                f"Warning: API cache error, affected entries are not cached: {err}",
+                file=sys.stderr,
+            )
+
+    def get(self, key: str, ttl: float) -> Tuple[bool, object]:
+        """Return (hit, value); entries older than ttl seconds are misses."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT ts, value FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as err:
+            self._warn(err)
+            return False, None
+        if row is None or time.time() - row[0] >= ttl:
+            return False, None
+        return True, json_loads(row[1])
+
+    def set(self, key: str, value: object) -> None:
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, ts, value) VALUES (?, ?, ?)",
+                    (key, time.time(), json_dumps(value)),
+                )
+                self._pending += 1
+                if (
+                    self._pending >= CACHE_COMMIT_EVERY
+                    or time.monotonic() - self._last_commit >= CACHE_COMMIT_INTERVAL
+                ):
+                    self._commit()
+            except sqlite3.Error as err:
+                # Drop the uncommitted group rather than keep holding the write lock.
+                self._rollback()
+                self._warn(err)
+
+    def _commit(self) -> None:
+        self._conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def _rollback(self) -> None:
+        try:
+            self._conn.rollback()
+        except sqlite3.Error:
+            pass
+        self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._commit()
+            except sqlite3.Error as err:
+                self._rollback()
+                self._warn(err)
+            self._conn.close()
 
 
 def subtract_months(date: dt.date, months: int) -> dt.date:
@@ -79,89 +375,204 @@ def _last_day_of_month(year: int, month: int) -> int:
     return (next_month - dt.timedelta(days=1)).day
 
 
+def _match_date(raw: str) -> Optional[dt.date]:
+    match = _date_match(raw)
+    if not match:
+        return None
+    year, _, month, day = match.groups()
+    try:
+        return dt.date(int(year), int(month or 1), int(day or 1))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
 def parse_opening_date(raw: str) -> Optional[dt.date]:
+    # Cached: many OSM elements share the same date strings.
     raw = raw.strip()
     if not raw:
         return None
 
-    # Normalize common ISO-like formats with time.
-    raw = raw.replace("T", " ").split(" ")[0]
-
-    for fmt in DATE_PATTERNS:
-        try:
-            parsed = dt.datetime.strptime(raw, fmt).date()
-            return parsed
-        except ValueError:
-            continue
-
-    # Handle ranges like "2025-06-01/2025-06-30" by taking start.
-    if "/" in raw:
-        start = raw.split("/")[0].strip()
-        for fmt in DATE_PATTERNS:
+    # Fast path for the common "YYYY-MM-DD[T...]" shape; anything else (or a
+    # failed parse) goes through the regex below. Ranges ("date/date") fail the
+    # raw[10] check, so no separate scan for "/" is needed.
+    if len(raw) >= 10 and raw[4] == "-" and raw[7] == "-":
+        if len(raw) == 10 or raw[10] in " T":
             try:
-                return dt.datetime.strptime(start, fmt).date()
+                return dt.date.fromisoformat(raw[:10])
             except ValueError:
-                continue
+                pass
 
-    return None
+    parsed = _match_date(raw)
+    if parsed is None and "/" in raw:
+        # Handle ranges like "2025-06-01/2025-06-30" by taking start.
+        parsed = _match_date(raw.split("/")[0].strip())
+    return parsed
 
 
-def amenity_regex(amenities: List[str]) -> str:
-    safe = [re.escape(a.strip()) for a in amenities if a.strip()]
-    if not safe:
+def amenity_regex(amenities: Iterable[str]) -> str:
+    # Order and repeats don't change what matches; normalizing them keeps the
+    # query text (and so its Overpass cache key) stable across invocations.
+    return _amenity_regex(tuple(sorted({a.strip() for a in amenities} - {""})))
+
+
+@functools.lru_cache(maxsize=32)
+def _amenity_regex(amenities: Tuple[str, ...]) -> str:
+    if not amenities:
         return "restaurant"
-    return "|".join(safe)
+    return "|".join(map(re.escape, amenities))
+
+
+def overpass_string(value: str) -> str:
+    """Escape a value for use inside a double-quoted Overpass QL string."""
+    return value.replace("\\", "\\\\").replace('"', '\\"')
 
 
 def overpass_query(city: str, cutoff: dt.date, use_newer_proxy: bool, amenity_re: str) -> str:
+    amenity_filter = f'nwr["amenity"~"^({amenity_re})$"]'
+    # One pass over the area for both date tags instead of a statement per tag.
     parts = [
-        f'nwr["amenity"~"^({amenity_re})$"]["opening_date"](area.searchArea);',
-        f'nwr["amenity"~"^({amenity_re})$"]["start_date"](area.searchArea);',
+        f'{amenity_filter}(if:is_tag("opening_date")||is_tag("start_date"))(area.searchArea);',
     ]
     if use_newer_proxy:
-        newer_clause = f'(newer:"{cutoff.isoformat()}T00:00:00Z")'
-        parts.append(
-            f'nwr["amenity"~"^({amenity_re})$"]{newer_clause}(area.searchArea);'
-        )
+        parts.append(f'{amenity_filter}(newer:"{cutoff.isoformat()}T00:00:00Z")(area.searchArea);')
 
     parts_block = "\n  ".join(parts)
+    city_name = overpass_string(city.strip())
 
+    # meta already includes tags; qt skips the server-side sort by id.
     return f"""
 [out:json][timeout:180];
-area["name"="{city}"]["boundary"="administrative"]["admin_level"="8"]->.searchArea;
+area["name"="{city_name}"]["boundary"="administrative"]["admin_level"="8"]->.searchArea;
 (
   {parts_block}
 );
-out center tags meta;
-"""
+out center meta qt;
+""".strip()
+
+
+def overpass_cache_path(cache_dir: str, query: str) -> Path:
+    # Content-addressed: identical queries share one cached response.
+    key = hashlib.blake2b(query.encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir).expanduser() / f"overpass_{key}.json.gz"
+
+
+def read_overpass_cache(path: Path, ttl: float) -> Optional[Dict]:
+    try:
+        if time.time() - path.stat().st_mtime >= ttl:
+            return None
+        return json_loads(gzip.decompress(path.read_bytes()))
+    except (OSError, ValueError):
+        return None
 
 
-def fetch_overpass(city: str, cutoff: dt.date, use_newer_proxy: bool, amenity_re: str) -> Dict:
+def write_overpass_cache(path: Path, raw: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(gzip.compress(raw))
+    os.replace(tmp_path, path)
+
+
+def fetch_overpass(
+    city: str,
+    cutoff: dt.date,
+    use_newer_proxy: bool,
+    amenity_re: str,
+    cache_dir: str = "",
+    cache_ttl: float = 3600,
+) -> List[Dict]:
+    """Return the Overpass result elements; the surrounding payload is dropped."""
     query = overpass_query(city, cutoff, use_newer_proxy, amenity_re)
+
+    cache_path = overpass_cache_path(cache_dir, query) if cache_dir else None
+    if cache_path is not None:
+        cached = read_overpass_cache(cache_path, cache_ttl)
+        if cached is not None:
+            return cached.get("elements") or []
+
     data = urllib.parse.urlencode({"data": query}).encode("utf-8")
 
-    last_err = None
-    for url in OVERPASS_URLS:
+    # Mirrors are tried in order; the next one starts as soon as the current one
+    # fails, or as a hedge once it has run for OVERPASS_HEDGE_DELAY. A healthy
+    # primary is therefore the only server that runs the (heavy) query.
+    results: queue.Queue = queue.Queue()
+
+    def attempt(url: str) -> None:
         try:
-            req = urllib.request.Request(url, data=data, method="POST")
-            with urllib.request.urlopen(req, timeout=180) as resp:
-                return json.loads(resp.read().decode("utf-8"))
+            raw = http_request(url, data=data, method="POST", timeout=180)
+            results.put((raw, json_loads(raw), None))
         except Exception as err:  # noqa: BLE001
-            last_err = err
+            results.put((None, None, err))
+
+    pending_urls = iter(OVERPASS_URLS)
+
+    def start_next() -> bool:
+        url = next(pending_urls, None)
+        if url is None:
+            return False
+        # Daemon threads: a hung loser must not keep the process alive.
+        threading.Thread(target=attempt, args=(url,), daemon=True).start()
+        return True
+
+    running = int(start_next())
+    last_err = None
+    while running:
+        try:
+            raw, payload, err = results.get(timeout=OVERPASS_HEDGE_DELAY)
+        except queue.Empty:
+            running += start_next()
+            continue
+        running -= 1
+        if payload is None:
+            last_err = err or last_err
+            running += start_next()
             continue
+        if cache_path is not None:
+            try:
+                write_overpass_cache(cache_path, raw)
+            except OSError as err:
+                print(f"Warning: could not write Overpass cache: {err}", file=sys.stderr)
+        return payload.get("elements") or []
 
     raise RuntimeError(f"All Overpass endpoints failed. Last error: {last_err}")
 
 
-def reverse_geocode(lat: float, lon: float, user_agent: str) -> Optional[str]:
+def reverse_geocode(
+    lat: float, lon: float, user_agent: str, cache: Optional[ResponseCache] = None
+) -> Optional[str]:
+    # 4 decimals is a ~11 m grid: close enough to share one address.
+    key = f"geo:{lat:.4f}:{lon:.4f}"
+    if cache is not None:
+        hit, display_name = cache.get(key, GEOCODE_CACHE_TTL)
+        if hit:
+            return display_name
+
     params = urllib.parse.urlencode({"lat": lat, "lon": lon, "format": "jsonv2"})
-    req = urllib.request.Request(
+    # Only real requests count against Nominatim's rate limit.
+    NOMINATIM_LIMITER.wait()
+    body = http_request(
         f"{NOMINATIM_URL}?{params}",
         headers={"User-Agent": user_agent},
+        timeout=20,
     )
-    with urllib.request.urlopen(req, timeout=20) as resp:
-        payload = json.loads(resp.read().decode("utf-8"))
-    return payload.get("display_name")
+    payload = json_loads(body)
+    display_name = payload.get("display_name")
+    if cache is not None:
+        cache.set(key, display_name)
+    return display_name
+
+
+def reverse_geocode_element(
+    el: Dict, user_agent: str, cache: Optional[ResponseCache] = None
+) -> str:
+    """Nominatim address for the element's coordinates, or "" if unknown or failed."""
+    lat, lon = element_coords(el)
+    if lat is None or lon is None:
+        return ""
+    try:
+        return reverse_geocode(lat, lon, user_agent, cache) or ""
+    except Exception:
+        return ""
 
 
 def osm_first_timestamp(element: Dict, user_agent: str) -> Optional[str]:
@@ -172,10 +583,9 @@ def osm_first_timestamp(element: Dict, user_agent: str) -> Optional[str]:
 
     # OSM history API returns XML
     url = f"{OSM_API_BASE}/{el_type}/{el_id}/history"
-    req = urllib.request.Request(url, headers={"User-Agent": user_agent})
+    OSM_HISTORY_LIMITER.wait()
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            xml_text = resp.read().decode("utf-8")
+        xml_text = http_request(url, headers={"User-Agent": user_agent}).decode("utf-8")
     except Exception:
         return None
 
@@ -187,6 +597,9 @@ def osm_first_timestamp(element: Dict, user_agent: str) -> Optional[str]:
 
 
 def build_address(tags: Dict[str, str]) -> Optional[str]:
+    # Many elements carry no address at all; one C-level check skips six misses.
+    if tags.keys().isdisjoint(_ADDR_KEYS):
+        return None
     if "addr:full" in tags:
         return tags["addr:full"].strip()
 
@@ -215,48 +628,109 @@ def build_address(tags: Dict[str, str]) -> Optional[str]:
 
 
 def build_tags(tags: Dict[str, str]) -> List[str]:
-    tag_list = []
+    """Return the element's tags as a sorted list of unique strings."""
+    get = tags.get
 
-    amenity = tags.get("amenity")
-    if amenity:
-        tag_list.append(amenity)
-
-    cuisine = tags.get("cuisine")
+    # Every entry carries its own "key:" prefix, so only cuisine items can
+    # repeat; dedupe those alone instead of hashing the whole list.
+    tag_list = []
+    cuisine = get("cuisine")
     if cuisine:
-        for item in re.split(r"[;,_]", cuisine):
-            item = item.strip()
-            if item:
-                tag_list.append(f"cuisine:{item}")
+        items = (item.strip() for item in cuisine.translate(_CUISINE_SEPARATORS).split(";"))
+        tag_list = [f"cuisine:{item}" for item in dict.fromkeys(items) if item]
+    append = tag_list.append
 
-    for key in ["outdoor_seating", "delivery", "takeaway", "vegetarian", "vegan"]:
-        val = tags.get(key)
-        if val in ("yes", "no"):
-            tag_list.append(f"{key}:{val}")
+    for key in _YES_NO_KEYS:
+        val = get(key)
+        if val == "yes" or val == "no":
+            append(f"{key}:{val}")
 
     # Include diet tags, e.g., diet:vegetarian=yes
-    for k, v in tags.items():
-        if k.startswith("diet:") and v:
-            tag_list.append(f"{k}:{v}")
+    for k in tags:
+        if k.startswith(_DIET_PREFIX):
+            v = tags[k]
+            if v:
+                append(f"{k}:{v}")
+
+    # The bare amenity value has no prefix; check it against the rest.
+    amenity = get("amenity")
+    if amenity and (":" not in amenity or amenity not in tag_list):
+        append(amenity)
+
+    tag_list.sort()
+    return tag_list
+
+
+def extract_elements(
+    elements: Iterable[Dict], amenity_set: Optional[frozenset] = None
+) -> Iterable[Tuple[Dict, Dict[str, str]]]:
+    """Yield (element, tags) for tagged elements, optionally re-checking amenity."""
+    for el in elements:
+        tags = el.get("tags")
+        if not tags:
+            continue
+        if amenity_set is not None and tags.get("amenity", "").lower() not in amenity_set:
+            continue
+        yield el, tags
 
-    return sorted(set(tag_list))
 
+def osm_candidates(
+    elements: Iterable[Dict],
+    cutoff: dt.date,
+    allow_undated: bool,
+    amenity_set: Optional[frozenset] = None,
+) -> Iterable[Tuple[Dict, Dict[str, str], Optional[dt.date]]]:
+    """Yield (element, tags, opening_date) for elements opened on/after cutoff."""
+    cutoff_iso = cutoff.isoformat()
 
-def extract_elements(payload: Dict, amenity_pattern: re.Pattern[str]) -> Iterable[Dict]:
-    for el in payload.get("elements", []):
-        tags = el.get("tags", {})
-        if not tags:
+    for el, tags in extract_elements(elements, amenity_set):
+        opening_raw = tags.get("opening_date") or tags.get("start_date")
+
+        # Most values are ISO-like; a plain string compare on the YYYY-MM-DD prefix
+        # already proves they are before the cutoff, so skip the full parse. Not
+        # with allow_undated: an unparseable value ("2024-05-01..2024-06-01") is
+        # kept there as undated, so it has to reach parse_opening_date.
+        if (
+            not allow_undated
+            and opening_raw
+            and len(opening_raw) >= 10
+            and opening_raw[:4].isdigit()
+            and opening_raw[4] in "-/."
+            and opening_raw[:10] < cutoff_iso
+        ):
+            continue
+
+        opening_date = parse_opening_date(opening_raw) if opening_raw else None
+
+        # If this is from the newer-proxy path, allow missing opening_date
+        if opening_date is None and not allow_undated:
             continue
-        amenity = tags.get("amenity", "")
-        if not amenity_pattern.match(amenity):
+        if opening_date and opening_date < cutoff:
             continue
-        yield el
+
+        yield el, tags, opening_date
+
+
+def element_coords(el: Dict) -> Tuple[Optional[float], Optional[float]]:
+    """Node coordinates, or the "center" Overpass adds for ways and relations."""
+    lat = el.get("lat")
+    if lat is not None:
+        return lat, el.get("lon")
+    center = el.get("center")
+    if center:
+        return center.get("lat"), center.get("lon")
+    return None, None
 
 
 def format_description(tags: Dict[str, str]) -> Optional[str]:
     # Prefer description tags if present.
-    for key in ["description", "description:en", "short_description", "note"]:
-        if key in tags and tags[key].strip():
-            return tags[key].strip()
+    if not tags.keys().isdisjoint(_DESCRIPTION_KEYS):
+        for key in _DESCRIPTION_KEYS:
+            value = tags.get(key)
+            if value:
+                value = value.strip()
+                if value:
+                    return value
 
     # Fallback to concise descriptor from cuisine.
     cuisine = tags.get("cuisine")
@@ -271,6 +745,7 @@ def google_places_text_search(
     language_code: str = "en",
     included_type: Optional[str] = None,
     location_bias: Optional[Dict] = None,
+    cache: Optional[ResponseCache] = None,
 ) -> List[Dict]:
     body = {
         "textQuery": query,
@@ -283,6 +758,13 @@ def google_places_text_search(
     if location_bias:
         body["locationBias"] = location_bias
 
+    # The request body carries the query, language and bias, so it is the key.
+    key = "places:" + json.dumps(body, sort_keys=True)
+    if cache is not None:
+        hit, places = cache.get(key, GOOGLE_SEARCH_CACHE_TTL)
+        if hit:
+            return places
+
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": api_key,
@@ -292,17 +774,19 @@ def google_places_text_search(
         ),
     }
 
-    req = urllib.request.Request(
+    raw = http_request(
         GOOGLE_PLACES_TEXT_URL,
-        data=json.dumps(body).encode("utf-8"),
+        data=json_dumps(body),
         headers=headers,
         method="POST",
+        timeout=60,
     )
+    payload = json_loads(raw)
 
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        payload = json.loads(resp.read().decode("utf-8"))
-
-    return payload.get("places", [])
+    places = payload.get("places", [])
+    if cache is not None:
+        cache.set(key, places)
+    return places
 
 
 def google_place_details(place_id: str, api_key: str, field_mask: str) -> Dict:
@@ -311,13 +795,9 @@ def google_place_details(place_id: str, api_key: str, field_mask: str) -> Dict:
         "X-Goog-Api-Key": api_key,
         "X-Goog-FieldMask": field_mask,
     }
-    req = urllib.request.Request(
-        f"https://places.googleapis.com/v1/places/{place_id}",
-        headers=headers,
-        method="GET",
+    return json_loads(
+        http_request(f"https://places.googleapis.com/v1/places/{place_id}", headers=headers)
     )
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        return json.loads(resp.read().decode("utf-8"))
 
 
 def load_json_file(path: str) -> Dict[str, str]:
@@ -325,8 +805,7 @@ def load_json_file(path: str) -> Dict[str, str]:
     if not file_path.exists():
         return {}
     try:
-        with file_path.open(encoding="utf-8") as f:
-            data = json.load(f)
+        data = json_loads(file_path.read_bytes())
         if isinstance(data, dict):
             return {str(k): str(v) for k, v in data.items()}
     except Exception:
@@ -342,35 +821,86 @@ def save_json_file(path: str, data: Dict[str, str]) -> None:
 
 
 def normalize_key(name: str, address: str) -> str:
-    key = f"{name}|{address}".strip().lower()
-    key = re.sub(r"\s+", " ", key)
-    return key
+    # str.split() collapses whitespace runs and trims the ends without regex.
+    return " ".join(f"{name}|{address}".lower().split())
 
 
-def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+def within_radius(places: List[Dict], center: Tuple[float, float], radius_km: float) -> List[bool]:
+    """Flag Google places whose location lies within radius_km of center (haversine)."""
     # Radius of Earth in km
     r = 6371.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return r * c
+    radians, sin, cos = math.radians, math.sin, math.cos
+    phi0 = radians(center[0])
+    lon0 = center[1]
+    cos_phi0 = cos(phi0)
+    # distance <= radius_km  <=>  a <= sin^2(radius_km / 2r), so the per-place
+    # asin/sqrt of the full haversine formula is not needed.
+    a_max = sin(min(radius_km / (2 * r), math.pi / 2)) ** 2
+    flags = []
+    for place in places:
+        location = place.get("location") or {}
+        lat = location.get("latitude")
+        lon = location.get("longitude")
+        if lat is None or lon is None:
+            flags.append(False)
+            continue
+        phi = radians(lat)
+        a = sin((phi - phi0) / 2) ** 2 + cos_phi0 * cos(phi) * sin(radians(lon - lon0) / 2) ** 2
+        flags.append(a <= a_max)
+    return flags
 
 
 def prh_get_json(url: str, params: Optional[Dict[str, str]] = None) -> Dict:
     if params:
         url = f"{url}?{urllib.parse.urlencode(params)}"
-    req = urllib.request.Request(url)
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    # PRH detail lookups hit one host back to back; the pooled connection saves a
+    # TCP/TLS handshake per company.
+    return json_loads(http_request(url))
+
+
+def prh_company_details(
+    base_url: str,
+    company_path: str,
+    business_id: str,
+    cache: Optional[ResponseCache] = None,
+) -> Dict:
+    key = f"prh:{business_id}"
+    if cache is not None:
+        hit, details = cache.get(key, PRH_DETAILS_CACHE_TTL)
+        if hit:
+            return details
+    details = prh_get_json(prh_join(base_url, company_path.format(businessId=business_id)))
+    if cache is not None:
+        cache.set(key, details)
+    return details
+
+
+def prh_company_details_all(
+    base_url: str,
+    company_path: str,
+    companies: List[Dict],
+    cache: Optional[ResponseCache] = None,
+) -> List[Dict]:
+    """Fetch details for each company concurrently; failed or skipped lookups give {}."""
+
+    def fetch(company: Dict) -> Dict:
+        business_id = company.get("businessId", "")
+        if not business_id or not company_path:
+            return {}
+        try:
+            return prh_company_details(base_url, company_path, business_id, cache)
+        except Exception:
+            return {}
+
+    if not companies:
+        return []
+    # Bounded so PRH sees at most a handful of parallel requests.
+    with ThreadPoolExecutor(max_workers=min(PRH_DETAILS_WORKERS, len(companies))) as pool:
+        return list(pool.map(fetch, companies))
 
 
 def prh_get_text(url: str) -> str:
-    req = urllib.request.Request(url)
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        return resp.read().decode("utf-8")
+    return http_request(url).decode("utf-8")
 
 
 def prh_join(base: str, path: str) -> str:
@@ -382,12 +912,12 @@ def prh_join(base: str, path: str) -> str:
 def prh_discover_openapi_url(swagger_url: str) -> Optional[str]:
     html = prh_get_text(swagger_url)
     # Common Swagger UI config pattern: url: "..."
-    match = re.search(r'url\\s*:\\s*["\\\']([^"\\\']+)["\\\']', html)
+    match = _SWAGGER_URL_RE.search(html)
     if match:
         return urllib.parse.urljoin(swagger_url, match.group(1))
 
     # Alternate pattern: "urls": [{"url": "..."}]
-    match = re.search(r'"urls"\\s*:\\s*\\[\\s*\\{\\s*"url"\\s*:\\s*"([^"]+)"', html)
+    match = _SWAGGER_URLS_RE.search(html)
     if match:
         return urllib.parse.urljoin(swagger_url, match.group(1))
 
@@ -398,10 +928,10 @@ def prh_openapi_base_and_paths(openapi_url: str) -> Tuple[Optional[str], Optiona
     if not openapi_url.lower().endswith((".json", ".yaml", ".yml")):
         return None, None, None
 
-    text = prh_get_text(openapi_url)
     try:
-        spec = json.loads(text)
-    except json.JSONDecodeError:
+        # Parsed straight from the response bytes, without a decode() copy.
+        spec = json_loads(http_request(openapi_url))
+    except ValueError:
         return None, None, None
 
     base_url = None
@@ -435,17 +965,23 @@ def prh_guess_company_path(search_path: str) -> str:
     return "/{businessId}"
 
 
+_PRH_LANGUAGE_RANK = {"en": 0, "fi": 1, "sv": 2}
+
+
 def prh_pick_language(items: List[Dict], key: str) -> Optional[str]:
-    if not items:
-        return None
-    for lang in ("en", "fi", "sv"):
-        for item in items:
-            if item.get("language") == lang and item.get(key):
-                return item.get(key)
-    for item in items:
-        if item.get(key):
-            return item.get(key)
-    return None
+    # One pass: prefer en, then fi, then sv, then the first other item with a value.
+    best = None
+    best_rank = len(_PRH_LANGUAGE_RANK) + 1
+    for item in items or ():
+        value = item.get(key)
+        if not value:
+            continue
+        rank = _PRH_LANGUAGE_RANK.get(item.get("language"), len(_PRH_LANGUAGE_RANK))
+        if rank < best_rank:
+            if rank == 0:
+                return value
+            best, best_rank = value, rank
+    return best
 
 
 def prh_build_address(addresses: List[Dict]) -> str:
@@ -482,6 +1018,26 @@ def prh_resolve_base_url(
     today: dt.date,
     registered_office: str,
     business_line_code: Optional[str],
+    cache: Optional[ResponseCache] = None,
+) -> Tuple[str, str, str]:
+    # Discovery costs up to a few dozen probe requests; reuse today's answer.
+    cache_key = f"prh_endpoint:{today.isoformat()}"
+    if cache is not None:
+        hit, endpoint = cache.get(cache_key, PRH_ENDPOINT_CACHE_TTL)
+        if hit:
+            return tuple(endpoint)
+
+    endpoint = _prh_discover_endpoint(cutoff, today, registered_office, business_line_code)
+    if cache is not None:
+        cache.set(cache_key, endpoint)
+    return endpoint
+
+
+def _prh_discover_endpoint(
+    cutoff: dt.date,
+    today: dt.date,
+    registered_office: str,
+    business_line_code: Optional[str],
 ) -> Tuple[str, str, str]:
     probe_params: Dict[str, str] = {
         "companyRegistrationFrom": cutoff.isoformat(),
@@ -570,6 +1126,109 @@ def prh_fetch_companies(
     return results
 
 
+GOOGLE_QUERY_TEMPLATES = [
+    "restaurant in {city}",
+    "cafe in {city}",
+    "street food in {city}",
+    "new restaurant in {city}",
+    "bistro in {city}",
+    "food stall in {city}",
+    "food court in {city}",
+]
+
+
+def google_location_bias(city: str) -> Optional[Dict]:
+    if city.lower() != "helsinki":
+        return None
+    return {
+        "circle": {
+            "center": {"latitude": HELSINKI_CENTER[0], "longitude": HELSINKI_CENTER[1]},
+            "radius": HELSINKI_RADIUS_KM * 1000,
+        }
+    }
+
+
+def google_places_search_all(
+    city: str, api_key: str, cache: Optional[ResponseCache] = None
+) -> List[Tuple[str, List[Dict], Optional[Exception]]]:
+    """Run all Text Search queries concurrently; results come back in query order."""
+    queries = [t.format(city=city) for t in GOOGLE_QUERY_TEMPLATES]
+    location_bias = google_location_bias(city)
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        futures = [
+            pool.submit(
+                google_places_text_search,
+                q,
+                api_key=api_key,
+                language_code="en",
+                included_type=None,
+                location_bias=location_bias,
+                cache=cache,
+            )
+            for q in queries
+        ]
+
+    results: List[Tuple[str, List[Dict], Optional[Exception]]] = []
+    for q, future in zip(queries, futures):
+        try:
+            results.append((q, future.result(), None))
+        except Exception as err:  # noqa: BLE001
+            results.append((q, [], err))
+    return results
+
+
+def merge_places_by_id(place_lists: Iterable[List[Dict]]) -> List[Dict]:
+    """Union of several result lists, keeping the first occurrence of each place id."""
+    merged: List[Dict] = []
+    seen_ids = set()
+    for places in place_lists:
+        for place in places:
+            place_id = place.get("id")
+            if place_id:
+                if place_id in seen_ids:
+                    continue
+                seen_ids.add(place_id)
+            merged.append(place)
+    return merged
+
+
+def prh_lookup(
+    base_url_override: str,
+    cutoff: dt.date,
+    today: dt.date,
+    registered_office: str,
+    business_line_codes: List[str],
+    page_size: int,
+    max_results: int,
+    cache: Optional[ResponseCache] = None,
+) -> Tuple[str, str, List[Dict]]:
+    """Resolve the PRH endpoint and fetch companies; returns (base_url, company_path, companies)."""
+    if base_url_override:
+        base_url = base_url_override
+        search_path = ""
+        company_path = prh_guess_company_path(search_path)
+    else:
+        base_url, search_path, company_path = prh_resolve_base_url(
+            cutoff=cutoff,
+            today=today,
+            registered_office=registered_office,
+            business_line_code=business_line_codes[0] if business_line_codes else None,
+            cache=cache,
+        )
+    print(f"Using PRH BIS endpoint: {base_url}{search_path}", file=sys.stderr)
+    companies = prh_fetch_companies(
+        base_url=base_url,
+        search_path=search_path,
+        cutoff=cutoff,
+        today=today,
+        registered_office=registered_office,
+        business_line_codes=business_line_codes,
+        page_size=page_size,
+        max_results=max_results,
+    )
+    return base_url, company_path, companies
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Find new restaurant openings from OSM (Overpass).")
     parser.add_argument("--city", default="Helsinki", help="City name (default: Helsinki)")
@@ -605,6 +1264,28 @@ def main() -> int:
         action="store_true",
         help="Include OSM venues recently edited within the lookback window (lower confidence)",
     )
+    parser.add_argument(
+        "--overpass-cache-dir",
+        default=DEFAULT_OVERPASS_CACHE_DIR,
+        help=(
+            "Cache Overpass responses (gzip JSON keyed by query hash) in this directory "
+            f"(default: {DEFAULT_OVERPASS_CACHE_DIR}; empty string disables)"
+        ),
+    )
+    parser.add_argument(
+        "--overpass-cache-ttl",
+        type=float,
+        default=3600,
+        help="Max age in seconds of a cached Overpass response (default: 3600)",
+    )
+    parser.add_argument(
+        "--api-cache",
+        default=DEFAULT_API_CACHE,
+        help=(
+            "SQLite cache for Nominatim, Google Text Search and PRH detail lookups "
+            f"(default: {DEFAULT_API_CACHE}; empty string disables)"
+        ),
+    )
     parser.add_argument(
         "--osm-amenities",
         default="restaurant,cafe,fast_food",
@@ -669,7 +1350,34 @@ def main() -> int:
         help="PRH BIS max results to fetch (default: 200)",
     )
     args = parser.parse_args()
-
+    # Surrounding whitespace would only change the query text (and its cache keys).
+    args.city = args.city.strip()
+    if not args.city:
+        parser.error("--city must not be empty")
+
+    cache = None
+    # Only these sources make cached calls; a plain OSM run never touches the cache.
+    if args.api_cache and (args.reverse_geocode or args.google_places or args.prh_bis):
+        try:
+            cache = ResponseCache(args.api_cache)
+        except (OSError, sqlite3.Error) as err:
+            print(f"Warning: could not open API cache, running without it: {err}", file=sys.stderr)
+    try:
+        # Overpass, Google Places and PRH are independent network waits; a small pool
+        # lets them overlap while results are still consumed in the usual order.
+        with ThreadPoolExecutor(max_workers=3) as fetch_pool, contextlib.ExitStack() as stack:
+            return run(args, fetch_pool, stack, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def run(
+    args: argparse.Namespace,
+    fetch_pool: ThreadPoolExecutor,
+    stack: contextlib.ExitStack,
+    cache: Optional[ResponseCache] = None,
+) -> int:
     today = dt.date.today()
     cutoff = subtract_months(today, args.months)
 
@@ -677,69 +1385,135 @@ def main() -> int:
     if args.strict_restaurants:
         osm_amenities = ["restaurant"]
     amenity_re = amenity_regex(osm_amenities)
-    amenity_pattern = re.compile(rf"^({amenity_re})$", re.IGNORECASE)
+    # Every Overpass statement already filters on amenity_re; only the newer-proxy
+    # path gets the extra lowercased set check (matches amenity_regex() defaults).
+    amenity_set = None
+    if args.use_newer_proxy:
+        amenity_set = frozenset(a.lower() for a in osm_amenities) or frozenset({"restaurant"})
+
+    overpass_future = fetch_pool.submit(
+        fetch_overpass,
+        args.city,
+        cutoff,
+        args.use_newer_proxy,
+        amenity_re,
+        cache_dir=args.overpass_cache_dir,
+        cache_ttl=args.overpass_cache_ttl,
+    )
 
-    payload = fetch_overpass(args.city, cutoff, args.use_newer_proxy, amenity_re)
-    rows = []
-    seen = set()
+    google_future = None
+    if args.google_places:
+        api_key = os.environ.get("GOOGLE_PLACES_API_KEY", "").strip()
+        if not api_key:
+            print(
+                "Warning: GOOGLE_PLACES_API_KEY not set; skipping Google Places.",
+                file=sys.stderr,
+            )
+        else:
+            google_future = fetch_pool.submit(
+                google_places_search_all, args.city, api_key, cache
+            )
 
-    for el in extract_elements(payload, amenity_pattern):
-        tags = el.get("tags", {})
-        opening_raw = tags.get("opening_date") or tags.get("start_date")
+    prh_future = None
+    if args.prh_bis:
+        business_line_codes = [
+            c.strip() for c in args.prh_business_line_codes.split(",") if c.strip()
+        ]
+        if args.strict_restaurants:
+            # Keep narrow by default when strict
+            business_line_codes = ["56"]
+        prh_future = fetch_pool.submit(
+            prh_lookup,
+            args.prh_base_url,
+            cutoff=cutoff,
+            today=today,
+            registered_office=args.prh_registered_office,
+            business_line_codes=business_line_codes,
+            page_size=args.prh_page_size,
+            max_results=args.prh_max_results,
+            cache=cache,
+        )
 
-        opening_date = parse_opening_date(opening_raw) if opening_raw else None
+    elements = overpass_future.result()
 
-        # If this is from the newer-proxy path, allow missing opening_date
-        if opening_date is None and not args.use_newer_proxy:
-            continue
-        if opening_date and opening_date < cutoff:
-            continue
+    # Rows are streamed out as they are produced; only the dedupe keys are kept.
+    # The file is opened after the Overpass fetch so a failed run leaves it intact.
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    out_file = stack.enter_context(
+        open(args.output, "w", newline="", encoding="utf-8", buffering=OUTPUT_BUFFER_SIZE)
+    )
+    # Rows are written as tuples in OUTPUT_FIELDS order, skipping DictWriter's per-row dict.
+    writer = csv.writer(out_file)
+    writer.writerow(OUTPUT_FIELDS)
+    written = 0
+    seen = set()
 
-        name = tags.get("name") or ""
-        address = build_address(tags) or ""
-
-        if not address and args.reverse_geocode:
-            lat = el.get("lat") or el.get("center", {}).get("lat")
-            lon = el.get("lon") or el.get("center", {}).get("lon")
-            if lat is not None and lon is not None:
-                try:
-                    address = reverse_geocode(lat, lon, args.nominatim_user_agent) or ""
-                    # Be polite with rate limits.
-                    time.sleep(1)
-                except Exception:
-                    address = ""
+    candidates = [
+        (el, tags, opening_date, build_address(tags) or "")
+        for el, tags, opening_date in osm_candidates(
+            elements, cutoff, args.use_newer_proxy, amenity_set
+        )
+    ]
 
-        description = format_description(tags) or ""
-        tag_list = build_tags(tags)
+    # Queue every missing address up front: one worker drains them at Nominatim's
+    # 1 req/sec (reverse_geocode() enforces it) while rows are built and written.
+    geocoded: List = [None] * len(candidates)
+    if args.reverse_geocode:
+        geo_pool = ThreadPoolExecutor(max_workers=1)
+        stack.callback(geo_pool.shutdown, wait=False, cancel_futures=True)
+        for i, (el, _, _, address) in enumerate(candidates):
+            if not address:
+                geocoded[i] = geo_pool.submit(
+                    reverse_geocode_element, el, args.nominatim_user_agent, cache
+                )
 
-        confidence = "high" if opening_date else "medium"
-        tag_list.append(f"confidence:{confidence}")
+    # Loop invariants, resolved once instead of per element.
+    writerow = writer.writerow
+    osm_history = args.osm_history
+    osm_user_agent = args.osm_user_agent
+    min_first_added = args.min_first_added
+    min_dt = None
+    if min_first_added:
+        try:
+            min_dt = dt.date.fromisoformat(min_first_added)
+        except ValueError:
+            # An unparsable minimum keeps no rows, as before.
+            pass
+    now_utc = dt.datetime.now(dt.timezone.utc)
+
+    for (el, tags, opening_date, address), geocode in zip(candidates, geocoded):
+        name = tags.get("name") or ""
+        if geocode is not None:
+            address = geocode.result()
 
         key = normalize_key(name, address)
         if key in seen:
             continue
         seen.add(key)
 
+        description = format_description(tags) or ""
+
+        # build_tags() is already sorted and unique; insort keeps it that way.
+        tag_list = build_tags(tags)
+        bisect.insort(tag_list, "confidence:high" if opening_date else "confidence:medium")
+
         last_edit = el.get("timestamp", "")
         last_edit_age_days = ""
         if last_edit:
             try:
                 last_dt = dt.datetime.fromisoformat(last_edit.replace("Z", "+00:00"))
-                last_edit_age_days = str((dt.datetime.now(dt.timezone.utc) - last_dt).days)
+                last_edit_age_days = str((now_utc - last_dt).days)
             except Exception:
                 last_edit_age_days = ""
 
         first_added = ""
-        if args.osm_history:
-            first_added = osm_first_timestamp(el, args.osm_user_agent) or ""
-            # Be gentle to the history API
-            time.sleep(1)
+        if osm_history:
+            first_added = osm_first_timestamp(el, osm_user_agent) or ""
 
-        if args.min_first_added:
-            if not first_added:
+        if min_first_added:
+            if not first_added or min_dt is None:
                 continue
             try:
-                min_dt = dt.date.fromisoformat(args.min_first_added)
                 first_dt = dt.date.fromisoformat(first_added.split("T")[0])
                 if first_dt < min_dt:
                     continue
@@ -747,33 +1521,28 @@ def main() -> int:
                 # If parsing fails, skip to avoid false positives
                 continue
 
-        rows.append(
-            {
-                "name": name,
-                "full_address": address,
-                "description": description,
-                "tags": ";".join(sorted(set(tag_list))),
-                "opening_date": opening_date.isoformat() if opening_date else "",
-                "osm_last_edit": el.get("timestamp", ""),
-                "osm_last_edit_age_days": last_edit_age_days,
-                "osm_first_added": first_added,
-                "google_place_id": "",
-                "google_first_seen": "",
-                "google_first_review_date": "",
-                "source": "OpenStreetMap",
-            }
+        writerow(
+            (
+                name,
+                address,
+                description,
+                ";".join(tag_list),
+                opening_date.isoformat() if opening_date else "",
+                last_edit,
+                last_edit_age_days,
+                first_added,
+                "",
+                "",
+                "",
+                "OpenStreetMap",
+            )
         )
+        written += 1
 
-    if args.google_places:
-        api_key = os.environ.get("GOOGLE_PLACES_API_KEY", "").strip()
-        if not api_key:
-            print(
-                "Warning: GOOGLE_PLACES_API_KEY not set; skipping Google Places.",
-                file=sys.stderr,
-            )
-        else:
-            google_allowed_types = {"restaurant", "cafe", "fast_food"}
-            google_excluded_types = {
+    if google_future is not None:
+        google_allowed_types = frozenset({"restaurant", "cafe", "fast_food"})
+        google_excluded_types = frozenset(
+            {
                 "bar",
                 "pub",
                 "night_club",
@@ -781,225 +1550,168 @@ def main() -> int:
                 "lodging",
                 "gas_station",
             }
-            if args.strict_restaurants:
-                google_allowed_types = {"restaurant"}
-                google_excluded_types.update({"cafe", "fast_food"})
-
-            details_fields = (
-                "displayName,formattedAddress,primaryType,types,rating,userRatingCount,"
-                "priceLevel,takeout,delivery,dineIn,reservable,outdoorSeating,"
-                "servesVegetarianFood,servesBeer,servesWine,servesCocktails,"
-                "servesCoffee,servesBreakfast,servesLunch,servesDinner,servesDessert,"
-                "regularOpeningHours,reviews"
-            )
-            details_calls = 0
-            first_seen = load_json_file(args.google_first_seen_file)
-            first_seen_changed = False
-
-            queries = [
-                f"restaurant in {args.city}",
-                f"cafe in {args.city}",
-                f"street food in {args.city}",
-                f"new restaurant in {args.city}",
-                f"bistro in {args.city}",
-                f"food stall in {args.city}",
-                f"food court in {args.city}",
-            ]
-            location_bias = None
-            if args.city.lower() == "helsinki":
-                location_bias = {
-                    "circle": {
-                        "center": {"latitude": HELSINKI_CENTER[0], "longitude": HELSINKI_CENTER[1]},
-                        "radius": HELSINKI_RADIUS_KM * 1000,
-                    }
-                }
-            for q in queries:
-                try:
-                    places = google_places_text_search(
-                        q,
-                        api_key=api_key,
-                        language_code="en",
-                        included_type=None,
-                        location_bias=location_bias,
-                    )
-                except Exception as err:  # noqa: BLE001
-                    print(f"Google Places error for query '{q}': {err}", file=sys.stderr)
-                    continue
+        )
+        if args.strict_restaurants:
+            google_allowed_types = frozenset({"restaurant"})
+            google_excluded_types |= {"cafe", "fast_food"}
+
+        details_fields = (
+            "displayName,formattedAddress,primaryType,types,rating,userRatingCount,"
+            "priceLevel,takeout,delivery,dineIn,reservable,outdoorSeating,"
+            "servesVegetarianFood,servesBeer,servesWine,servesCocktails,"
+            "servesCoffee,servesBreakfast,servesLunch,servesDinner,servesDessert,"
+            "regularOpeningHours,reviews"
+        )
+        details_calls = 0
+        first_seen = load_json_file(args.google_first_seen_file)
+        first_seen_changed = False
+
+        results = google_future.result()
+        for q, _, err in results:
+            if err is not None:
+                print(f"Google Places error for query '{q}': {err}", file=sys.stderr)
+        # The queries overlap heavily; merge by place id so each place is filtered,
+        # distance-checked and (optionally) detail-fetched once.
+        places = merge_places_by_id(places for _, places, err in results if err is None)
+
+        near = [False] * len(places)
+        if args.city.lower() == "helsinki":
+            near = within_radius(places, HELSINKI_CENTER, HELSINKI_RADIUS_KM)
+
+        for place, is_near in zip(places, near):
+            display = place.get("displayName", {})
+            name = display.get("text", "") if isinstance(display, dict) else ""
+            address = place.get("formattedAddress", "")
+            place_id = place.get("id", "")
+
+            types = place.get("types", []) or []
+            primary = place.get("primaryType")
+            # Membership tests only; no per-place set of types is built.
+            if primary in google_excluded_types or any(
+                t in google_excluded_types for t in types
+            ):
+                continue
+            if primary not in google_allowed_types and not any(
+                t in google_allowed_types for t in types
+            ):
+                continue
 
-                for place in places:
-                    display = place.get("displayName", {})
-                    name = display.get("text", "") if isinstance(display, dict) else ""
-                    address = place.get("formattedAddress", "")
-                    place_id = place.get("id", "")
-
-                    types = place.get("types", []) or []
-                    primary = place.get("primaryType")
-                    type_set = set(types)
-                    if primary:
-                        type_set.add(primary)
-                    if type_set & google_excluded_types:
-                        continue
-                    if not (type_set & google_allowed_types):
-                        continue
-
-                    keep = False
-                    if address and args.city.lower() in address.lower():
-                        keep = True
-
-                    location = place.get("location") or {}
-                    lat = location.get("latitude")
-                    lon = location.get("longitude")
-                    if lat is not None and lon is not None and args.city.lower() == "helsinki":
-                        distance = haversine_km(lat, lon, HELSINKI_CENTER[0], HELSINKI_CENTER[1])
-                        if distance <= HELSINKI_RADIUS_KM:
-                            keep = True
-
-                    if not keep:
-                        continue
-
-                    details = {}
-                    if args.google_details and details_calls < args.google_details_limit:
-                        if place_id:
-                            try:
-                                details = google_place_details(
-                                    place_id=place_id,
-                                    api_key=api_key,
-                                    field_mask=details_fields,
-                                )
-                                details_calls += 1
-                            except Exception:
-                                details = {}
-
-                    tag_list = ["source:google_places", "confidence:low"]
-                    if primary:
-                        tag_list.append(f"type:{primary}")
-                    for t in types:
-                        tag_list.append(f"type:{t}")
-
-                    google_first_seen = ""
-                    if place_id:
-                        if place_id not in first_seen:
-                            first_seen[place_id] = dt.date.today().isoformat()
-                            first_seen_changed = True
-                        google_first_seen = first_seen.get(place_id, "")
-
-                    google_first_review_date = ""
-                    if details:
-                        reviews = details.get("reviews") or []
-                        review_dates = []
-                        for review in reviews:
-                            ts = review.get("publishTime")
-                            if ts:
-                                review_dates.append(ts.split("T")[0])
-                        if review_dates:
-                            google_first_review_date = sorted(review_dates)[0]
-
-                    if details:
-                        rating = details.get("rating")
-                        if rating is not None:
-                            tag_list.append(f"rating:{rating}")
-                        rating_count = details.get("userRatingCount")
-                        if rating_count is not None:
-                            tag_list.append(f"ratings:{rating_count}")
-                        price_level = details.get("priceLevel")
-                        if price_level:
-                            tag_list.append(f"price_level:{price_level}")
-
-                        for field in [
-                            "takeout",
-                            "delivery",
-                            "dineIn",
-                            "reservable",
-                            "outdoorSeating",
-                            "servesVegetarianFood",
-                            "servesBeer",
-                            "servesWine",
-                            "servesCocktails",
-                            "servesCoffee",
-                            "servesBreakfast",
-                            "servesLunch",
-                            "servesDinner",
-                            "servesDessert",
-                        ]:
-                            if details.get(field) is True:
-                                tag_list.append(f"{field}:yes")
-                            elif details.get(field) is False:
-                                tag_list.append(f"{field}:no")
-
-                    key = normalize_key(name, address)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-
-                    rows.append(
-                        {
-                            "name": name,
-                            "full_address": address,
-                            "description": "Google Places candidate (no opening_date provided)",
-                            "tags": ";".join(sorted(set(tag_list))),
-                            "opening_date": "",
-                            "osm_last_edit": "",
-                            "osm_last_edit_age_days": "",
-                            "osm_first_added": "",
-                            "google_place_id": place_id,
-                            "google_first_seen": google_first_seen,
-                            "google_first_review_date": google_first_review_date,
-                            "source": "Google Places (Text Search)",
-                        }
-                    )
-
-            if first_seen_changed:
-                save_json_file(args.google_first_seen_file, first_seen)
+            keep = is_near
+            if address and args.city.lower() in address.lower():
+                keep = True
 
-    if args.prh_bis:
-        business_line_codes = [
-            c.strip() for c in args.prh_business_line_codes.split(",") if c.strip()
-        ]
-        if args.strict_restaurants:
-            # Keep narrow by default when strict
-            business_line_codes = ["56"]
+            if not keep:
+                continue
 
-        try:
-            if args.prh_base_url:
-                base_url = args.prh_base_url
-                search_path = ""
-                company_path = prh_guess_company_path(search_path)
-            else:
-                base_url, search_path, company_path = prh_resolve_base_url(
-                    cutoff=cutoff,
-                    today=today,
-                    registered_office=args.prh_registered_office,
-                    business_line_code=business_line_codes[0] if business_line_codes else None,
+            details = {}
+            if args.google_details and details_calls < args.google_details_limit:
+                if place_id:
+                    try:
+                        details = google_place_details(
+                            place_id=place_id,
+                            api_key=api_key,
+                            field_mask=details_fields,
+                        )
+                        details_calls += 1
+                    except Exception:
+                        details = {}
+
+            tag_list = ["source:google_places", "confidence:low"]
+            # Google returns unique types; primary is the only possible repeat.
+            if primary and primary not in types:
+                tag_list.append(f"type:{primary}")
+            for t in types:
+                tag_list.append(f"type:{t}")
+
+            google_first_seen = ""
+            if place_id:
+                if place_id not in first_seen:
+                    first_seen[place_id] = dt.date.today().isoformat()
+                    first_seen_changed = True
+                google_first_seen = first_seen.get(place_id, "")
+
+            google_first_review_date = ""
+            if details:
+                reviews = details.get("reviews") or []
+                review_dates = []
+                for review in reviews:
+                    ts = review.get("publishTime")
+                    if ts:
+                        review_dates.append(ts.split("T")[0])
+                if review_dates:
+                    google_first_review_date = sorted(review_dates)[0]
+
+            if details:
+                rating = details.get("rating")
+                if rating is not None:
+                    tag_list.append(f"rating:{rating}")
+                rating_count = details.get("userRatingCount")
+                if rating_count is not None:
+                    tag_list.append(f"ratings:{rating_count}")
+                price_level = details.get("priceLevel")
+                if price_level:
+                    tag_list.append(f"price_level:{price_level}")
+
+                for field in [
+                    "takeout",
+                    "delivery",
+                    "dineIn",
+                    "reservable",
+                    "outdoorSeating",
+                    "servesVegetarianFood",
+                    "servesBeer",
+                    "servesWine",
+                    "servesCocktails",
+                    "servesCoffee",
+                    "servesBreakfast",
+                    "servesLunch",
+                    "servesDinner",
+                    "servesDessert",
+                ]:
+                    if details.get(field) is True:
+                        tag_list.append(f"{field}:yes")
+                    elif details.get(field) is False:
+                        tag_list.append(f"{field}:no")
+
+            key = normalize_key(name, address)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            writer.writerow(
+                (
+                    name,
+                    address,
+                    "Google Places candidate (no opening_date provided)",
+                    ";".join(sorted(tag_list)),
+                    "",
+                    "",
+                    "",
+                    "",
+                    place_id,
+                    google_first_seen,
+                    google_first_review_date,
+                    "Google Places (Text Search)",
                 )
-            print(f"Using PRH BIS endpoint: {base_url}{search_path}", file=sys.stderr)
-            companies = prh_fetch_companies(
-                base_url=base_url,
-                search_path=search_path,
-                cutoff=cutoff,
-                today=today,
-                registered_office=args.prh_registered_office,
-                business_line_codes=business_line_codes,
-                page_size=args.prh_page_size,
-                max_results=args.prh_max_results,
             )
+            written += 1
+
+        if first_seen_changed:
+            save_json_file(args.google_first_seen_file, first_seen)
+
+    if prh_future is not None:
+        try:
+            base_url, company_path, companies = prh_future.result()
         except Exception as err:  # noqa: BLE001
             print(f"PRH BIS error: {err}", file=sys.stderr)
-            companies = []
+            base_url, company_path, companies = "", "", []
 
-        for company in companies:
+        details_list = prh_company_details_all(base_url, company_path, companies, cache)
+        for company, details in zip(companies, details_list):
             business_id = company.get("businessId", "")
             name = company.get("name", "") or ""
             registration_date = company.get("registrationDate", "") or ""
 
-            details = {}
-            if business_id and company_path:
-                try:
-                    details = prh_get_json(
-                        prh_join(base_url, company_path.format(businessId=business_id))
-                    )
-                except Exception:
-                    details = {}
-
             addresses = details.get("addresses") or company.get("addresses") or []
             address = prh_build_address(addresses)
 
@@ -1007,59 +1719,40 @@ def main() -> int:
             business_line = prh_pick_language(business_lines, "businessLine") or ""
             business_line_code = prh_pick_language(business_lines, "businessLineCode") or ""
 
-            tag_list = ["source:prh_bis", "confidence:medium"]
+            # Built in sorted order: the fixed prefixes decide it, whatever the values.
+            tag_list = []
+            if business_id:
+                tag_list.append(f"business_id:{business_id}")
             if business_line:
                 tag_list.append(f"business_line:{business_line}")
             if business_line_code:
                 tag_list.append(f"business_line_code:{business_line_code}")
-            if business_id:
-                tag_list.append(f"business_id:{business_id}")
+            tag_list += ["confidence:medium", "source:prh_bis"]
 
             key = normalize_key(name, address or business_id)
             if key in seen:
                 continue
             seen.add(key)
 
-            rows.append(
-                {
-                    "name": name,
-                    "full_address": address,
-                    "description": business_line or "PRH BIS registered company",
-                    "tags": ";".join(sorted(set(tag_list))),
-                    "opening_date": registration_date,
-                    "osm_last_edit": "",
-                    "osm_last_edit_age_days": "",
-                    "osm_first_added": "",
-                    "google_place_id": "",
-                    "google_first_seen": "",
-                    "google_first_review_date": "",
-                    "source": "PRH BIS (registration date)",
-                }
+            writer.writerow(
+                (
+                    name,
+                    address,
+                    business_line or "PRH BIS registered company",
+                    ";".join(tag_list),
+                    registration_date,
+                    "",
+                    "",
+                    "",
+                    "",
+                    "",
+                    "",
+                    "PRH BIS (registration date)",
+                )
             )
+            written += 1
 
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    with open(args.output, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "name",
-                "full_address",
-                "description",
-                "tags",
-                "opening_date",
-                "osm_last_edit",
-                "osm_last_edit_age_days",
-                "osm_first_added",
-                "google_place_id",
-                "google_first_seen",
-                "google_first_review_date",
-                "source",
-            ],
-        )
-        writer.writeheader()
-        writer.writerows(rows)
-
-    print(f"Wrote {len(rows)} rows to {args.output}")
+    print(f"Wrote {written} rows to {args.output}")
     return 0
 
 